@@ -17,23 +17,27 @@ an evaluation report.
 """
 
 # Instructions on how to run the script:
-# 1) Requirements: install spacy for German and tabulate in a virtual environment
+# 1) Requirements: install spacy for German, numpy and tabulate in a virtual environment
 # $ python3 -m venv myenv
 # $ source myenv/bin/activate
 # $ pip install -U pip setuptools wheel
 # $ pip install -U spacy
 # $ python -m spacy download de_core_news_sm
-# $ pip install tabulate
+# $ pip install tabulate numpy
 
 # 2) Run the script like so: #todo
 # $ python3 evaluation.py WUS_POS_data/dev_norm_out.txt WUS_POS_data/test_norm_out.txt
 
+import numpy as np
 import spacy
 from tabulate import tabulate
+import os
 import sys
 
 nlp = spacy.load('de_core_news_sm')  # load model
 
+BUFFER_SIZE = 1 << 20  # 1 MiB file buffer, fewer read/write calls on large corpora
+
 # ---------------------------------- Pre-processing a text for POS tagging -----------------------------------------
 # SpaCy expects sentences as inputs, not tokens or an entire text.
 # get lists of sentences for dev & text data for 3 settings each (lower bound, upper bound, baseline)
@@ -45,67 +49,52 @@ def columns_to_lists(lines):
     following information (tab seperated): Normalization strategy, non-standard, automatic normalization,
     normalization gold standard, POS gold standard:
     Input = ['A\ti\tich\tich\tPPER\n', 'U\tmuen\tmuss\tmuss\tVMFIN\n', 'U\talles\talles\talles\tPIS\n', ...]
-    Returns the entire tokenized text in three lists: lower bound, upper bound, baseline
+    Returns the entire tokenized text in three columns (views of one array): lower bound, upper bound, baseline
     Output = (['i', 'muen', 'alles', 'wüsse', ...],['ich', 'muss', 'alles', ...],['ich', 'muss', 'alles', ...])
     """
-    non_standard_list = []  # 1) lower bound -> column [1] = non_standard
-    norm_gs_list = []       # 2) upper bound -> column [3] = gold standard normalization
-    norm_aut_list = []      # 3) baseline -> column [2] = automatic normalization
-
-    # fill lists with data for upper bound, lower bound, baseline
-    for line in lines:
-        if line == "\n":
-            non_standard_list.append('\n')  # empty lines (sentence boundaries)
-            norm_gs_list.append('\n')
-            norm_aut_list.append('\n')
-        else:
-            non_standard_list.append(line.split('\t')[1].rstrip())   # lower bound data
-            norm_gs_list.append(line.split('\t')[3].rstrip())        # upper bound data
-            norm_aut_list.append(line.split('\t')[2].rstrip())       # baseline data
-
-    return non_standard_list, norm_gs_list, norm_aut_list
-
+    # parse every line once into one row (non_standard, automatic normalization, gold standard normalization)
+    # empty lines (sentence boundaries) are kept as a row of newlines
+    rows = [('\n', '\n', '\n') if line == "\n" else tuple(column.rstrip() for column in line.split('\t')[1:4])
+            for line in lines]
+    columns = np.array(rows, dtype=object).reshape(-1, 3)
 
-def sent_boundaries(lines):
-    """Helper function to create sentences from a tokenized text. This funciton returns indexes for sentence boundaries.
-    Input = ['A\ti\tich\tich\tPPER\n', '\n', 'U\talles\talles\talles\tPIS\n', ...]
-    Output = [1, 5, 12, 15, 17, 23, 33, 47, ...]
-    """
-    lines.append('\n')  # add newline at the end (needed for extract_sent function)
-    sent_boundaries_indexes = []
+    non_standard_list = columns[:, 0]  # 1) lower bound -> column [1] = non_standard
+    norm_gs_list = columns[:, 2]       # 2) upper bound -> column [3] = gold standard normalization
+    norm_aut_list = columns[:, 1]      # 3) baseline -> column [2] = automatic normalization
 
-    for i in range(len(lines)):
-        if lines[i] == '\n':
-            sent_boundaries_indexes.append(i)
-
-    return sent_boundaries_indexes
+    return non_standard_list, norm_gs_list, norm_aut_list
 
 
 def extract_sentences(text, lines):
-    """Takes a tokenized text as input and returns sentences.
+    """Takes a tokenized text as input and returns sentences. Empty lines in the original file are sentence boundaries.
+    Neither of the inputs is modified.
     Input:
     - text = ['i', 'muen', 'alles', 'wüsse', ...],
     - lines = original file we're working with (either dev_lines or text_lines)
     Output = ['i muen alles wüsse XD', 'Nei nur umeglege bis am 8', 'Die wahrheit']
     """
-    text.append('\n')  # needed in the for loop, so the last sentence will be added to sentences list
-
     sentence = []
     sentences = []
-    for i, token in enumerate(text):
-        if i in sent_boundaries(lines):  # locate sentence boundary
-            sentence = ' '.join(sentence)
-            sentences.append(sentence)
+    for token, line in zip(text, lines):
+        if line == '\n':  # locate sentence boundary
+            sentences.append(' '.join(sentence))
             sentence = []
         else:
             sentence.append(token)
 
+    if sentence:  # last sentence if the file doesn't end with an empty line
+        sentences.append(' '.join(sentence))
+
     return sentences
 
 
 # -------------------------------------------- POS tagging -----------------------------------------
 # tag all 6 lists (dev & text data for 3 settings each (lower bound, upper bound, baseline))
 
+# cache for tagged sentences: sentence -> [(token, POS), ...]
+# the 6 lists share most of their sentences (e.g. if the automatic normalization equals the gold standard)
+POS_cache = {}
+
 
 def predict_pos(text):
     """Takes a list of sentences and returns a list of tuples with token and pos tag.
@@ -114,14 +103,20 @@ def predict_pos(text):
     lines in dev- and text files.
     """
 
-    POS_predicted = []
+    # only the tagger is needed for token.tag_, thus the other pipeline components are disabled
+    disabled = ["parser", "ner", "lemmatizer", "attribute_ruler", "morphologizer"]
 
-    for sent in text:
-        doc = nlp(sent)
+    # only tag sentences that haven't been tagged before (each sentence only once)
+    new_sents = list(dict.fromkeys(sent for sent in text if sent not in POS_cache))
+
+    # sentences are processed in batches instead of one nlp() call per sentence
+    for sent, doc in zip(new_sents, nlp.pipe(new_sents, batch_size=256, disable=disabled, n_process=2)):
+        POS_cache[sent] = [(token.text, token.tag_) for token in doc]
 
-        for token in doc:
-            POS_predicted.append((token.text, token.tag_))
+    POS_predicted = []
 
+    for sent in text:
+        POS_predicted.extend(POS_cache[sent])
         POS_predicted.append('\n')
 
     return POS_predicted
@@ -170,52 +165,24 @@ def correct_pos(text, orig_tokens):
     for word in orig_tokens:
 
         # preserve empty lines
-        if len(word.split()) == 0:
+        if not word or word.isspace():
             correct_POS.append("\n")
             i += 1
 
-        # one-token expression --> fill tuple with word and corresponding tag
-        elif len(word.split()) == 1:  # one-token word --> fill tuple with word and corresponding tag
-
-            # handle cases spacy tokenizes that aren't tokenized in the input file
-            if word in d.keys():
-                correct_POS.append((word, d[word][0]))
-                i += d[word][1]  # tokenized in spacy
-            else:
-                correct_POS.append((predicted_POS[i][0], predicted_POS[i][1]))
-                i += 1
-
-        # multi-token word --> connect tags with '+'
-        elif len(word.split()) == 2:
-            word_1, tag_1 = predicted_POS[i][0], predicted_POS[i][1]
-            i += 1
-            word_2, tag_2 = predicted_POS[i][0], predicted_POS[i][1]
-            correct_POS.append((word_1 + '+' + word_2, tag_1 + '+' + tag_2))
-            i += 1
-
-        elif len(word.split()) == 3:
-            word_1, tag_1 = predicted_POS[i][0], predicted_POS[i][1]
-            i += 1
-            word_2, tag_2 = predicted_POS[i][0], predicted_POS[i][1]
-            i += 1
-            word_3, tag_3 = predicted_POS[i][0], predicted_POS[i][1]
-            correct_POS.append((word_1 + '+' + word_2 + '+' + word_3, tag_1 + '+' + tag_2 + '+' + tag_3))
-            i += 1
+        # handle cases spacy tokenizes that aren't tokenized in the input file
+        elif word in d:
+            correct_POS.append((word, d[word][0]))
+            i += d[word][1]  # tokenized in spacy
 
-        elif len(word.split()) == 4:  # maximum token length in this setting is 4
-            word_1, tag_1 = predicted_POS[i][0], predicted_POS[i][1]
-            i += 1
-            word_2, tag_2 = predicted_POS[i][0], predicted_POS[i][1]
-            i += 1
-            word_3, tag_3 = predicted_POS[i][0], predicted_POS[i][1]
-            i += 1
-            word_4, tag_4 = predicted_POS[i][0], predicted_POS[i][1]
-            correct_POS.append(
-                (word_1 + '+' + word_2 + '+' + word_3 + '+' + word_4, tag_1 + '+' + tag_2 + '+' + tag_3 + '+' + tag_4))
-            i += 1
+        # one-token word --> fill tuple with word and corresponding tag
+        # multi-token word --> connect words and tags with '+'
+        else:
+            n_tokens = word.count(' ') + 1
+            tokens = predicted_POS[i:i + n_tokens]
+            correct_POS.append(('+'.join(token[0] for token in tokens), '+'.join(token[1] for token in tokens)))
+            i += n_tokens
 
     # corract_POS = a list of (word, POS) tuples --> for checking where the text is tokenized differently by spaCy
-    correct_POS = correct_POS[:-1]  # remove the last newline that was added in the beginning of the sentence function
 
     # we only need POS in the output, not the tuples
     POS_only = []
@@ -235,6 +202,17 @@ def correct_pos(text, orig_tokens):
 # -------------------------------------------- Write 8 column files  -----------------------------------------
 
 
+def get_path_in(path):
+    """Strips the extension and the 'out' ending from the path of an input file (=output file of baseline.py) in order
+    to create the name of the output file, e.g. 'WUS_POS_data/dev_norm_out.txt' -> 'WUS_POS_data/dev_norm_'
+    """
+    path_in = os.path.splitext(path)[0]
+    if path_in.endswith("out"):
+        path_in = path_in[:-len("out")]
+
+    return path_in
+
+
 def write_outfile(orig_lines, POS_lb, POS_ub, POS_bl, path_in):
     """Writes a new 8 column file with the following informaiton:
     Norm. Strategy | non-standard | normaliz. predicted | normaliz. gs | POS gs | POS lb | POS ub | POS baseline
@@ -247,69 +225,51 @@ def write_outfile(orig_lines, POS_lb, POS_ub, POS_bl, path_in):
 
     path_out = path_in + "POS_out.txt"  # e.g. 'WUS_POS_data/dev_norm_POS_out.txt'
 
-    with open(path_out, 'w', encoding='utf8') as f_out:
-        i = 0
-        for line in orig_lines:
+    lines_out = []  # output lines are collected and written to the file at once
 
-            if line == "\n":  # keep empty lines (sentence boundaries)
-                f_out.write("\n")
-                i += 1
-            else:
-                f_out.write(line.rstrip() + '\t' + POS_lb[i] + '\t' + POS_ub[i] + '\t' + POS_bl[i] + '\n')
-                i += 1
+    for line, tag_lb, tag_ub, tag_bl in zip(orig_lines, POS_lb, POS_ub, POS_bl):
+
+        if line == "\n":  # keep empty lines (sentence boundaries)
+            lines_out.append("\n")
+        else:
+            lines_out.append(f"{line.rstrip()}\t{tag_lb}\t{tag_ub}\t{tag_bl}\n")
+
+    with open(path_out, 'w', encoding='utf8', buffering=BUFFER_SIZE) as f_out:
+        f_out.writelines(lines_out)
 
     return path_out
 
 # ---------------------------------- Accuracy calculation -----------------------------------------
 
 
-def calculate_accuracies(infile_path):
+# first character of a line (normalization strategy) -> integer code: 0 = unique, 1 = ambigue, 2 = new
+STRATEGY_CODES = {'U': 0, 'A': 1, 'N': 2}
 
-    # set up counters:
-    # 1) total number per normalization strategy
-    n_unique, n_ambigue, n_new = 0, 0, 0
 
-    # 2) counter for how often predicted POS = gold standard POS
-    same_u_lb, same_a_lb, same_n_lb = 0, 0, 0   # lower bound: unique, ambigue, new
-    same_u_ub, same_a_ub, same_n_ub = 0, 0, 0   # upper bound: unique, ambigue, new
-    same_u_b, same_a_b, same_n_b = 0, 0, 0      # baseline: unique, ambigue, new
+def calculate_accuracies(infile_path):
 
     # ----------- get counts needed for accurady calculation -----------
 
-    with open(infile_path, 'r', encoding='utf8') as infile:
+    with open(infile_path, 'r', encoding='utf8', buffering=BUFFER_SIZE) as infile:
         lines = infile.readlines()
 
-        for line in lines:
-            # UNIQUE
-            if line.startswith('U'):
-                n_unique += 1
-                if line.split('\t')[4] == line.split('\t')[5]:           # lower bound
-                    same_u_lb += 1
-                if line.split('\t')[4] == line.split('\t')[6]:           # upper bound
-                    same_u_ub += 1
-                if line.split('\t')[4] == line.split('\t')[7].rstrip():  # baseline
-                    same_u_b += 1
-            # AMBIGUE
-            elif line.startswith('A'):
-                n_ambigue += 1
-                if line.split('\t')[4] == line.split('\t')[5]:           # lower bound
-                    same_a_lb += 1
-                if line.split('\t')[4] == line.split('\t')[6]:           # upper bound
-                    same_a_ub += 1
-                if line.split('\t')[4] == line.split('\t')[7].rstrip():  # baseline
-                    same_a_b += 1
-            # NEW
-            elif line.startswith('N'):
-                n_new += 1
-                if line.split('\t')[4] == line.split('\t')[5]:           # lower bound
-                    same_n_lb += 1
-                if line.split('\t')[4] == line.split('\t')[6]:           # ub
-                    same_n_ub += 1
-                if line.split('\t')[4] == line.split('\t')[7].rstrip():  # baseline
-                    same_n_b += 1
-            # newlines
-            else:
-                pass
+    # only lines with a normalization strategy are tokens (empty lines = sentence boundaries are skipped)
+    token_lines = [line for line in lines if line[0] in STRATEGY_CODES]
+
+    # encode normalization strategy as integer
+    strategy = np.array([STRATEGY_CODES[line[0]] for line in token_lines], dtype=np.intp)
+
+    # one row per token, one column per field
+    columns = np.array([line.rstrip().split('\t') for line in token_lines])
+    POS_gs = columns[:, 4]
+
+    # 1) total number per normalization strategy
+    n_unique, n_ambigue, n_new = np.bincount(strategy, minlength=3).tolist()
+
+    # 2) counter for how often predicted POS = gold standard POS, per strategy
+    # columns 5, 6, 7 = POS lower bound, POS upper bound, POS baseline
+    (same_u_lb, same_a_lb, same_n_lb), (same_u_ub, same_a_ub, same_n_ub), (same_u_b, same_a_b, same_n_b) = \
+        (np.bincount(strategy, weights=columns[:, i] == POS_gs, minlength=3).astype(int).tolist() for i in (5, 6, 7))
 
     n_total = n_unique + n_ambigue + n_new
 
@@ -380,24 +340,22 @@ def write_report(dev_accuracies, test_accuracies):
 
 def main():
     # Open input files (=output files of baseline.py)
-    with open(sys.argv[1], 'r', encoding='utf8') as f_dev_in:
+    with open(sys.argv[1], 'r', encoding='utf8', buffering=BUFFER_SIZE) as f_dev_in:
         dev_lines = f_dev_in.readlines()
-        dev_path_in = f_dev_in.name.rstrip("out.txt")  # get path in order to create name of output file
+        dev_path_in = get_path_in(f_dev_in.name)  # get path in order to create name of output file
 
-    with open(sys.argv[2], 'r', encoding='utf8') as f_test_in:
+    with open(sys.argv[2], 'r', encoding='utf8', buffering=BUFFER_SIZE) as f_test_in:
         test_lines = f_test_in.readlines()
-        test_path_in = f_test_in.name.rstrip("out.txt")  # get path in order to create name of output file
+        test_path_in = get_path_in(f_test_in.name)  # get path in order to create name of output file
 
     # ---------------------------------- process DEVELOPMENT DATA -----------------------------------
     # get 3 lists of tokens for our 3 settings (lower bound, upper bound, baseline)
     non_standard_dev, norm_gs_dev, norm_aut_dev = columns_to_lists(dev_lines)
 
     # extract sentences
-    # for some reason, extract_sentences function updates dev_lines, thus we make a copy of it
-    dev_lines2 = dev_lines.copy()
-    non_standard_dev_sent = extract_sentences(non_standard_dev, dev_lines2)
-    norm_gs_dev_sent = extract_sentences(norm_gs_dev, dev_lines2)
-    norm_aut_dev_sent = extract_sentences(norm_aut_dev, dev_lines2)
+    non_standard_dev_sent = extract_sentences(non_standard_dev, dev_lines)
+    norm_gs_dev_sent = extract_sentences(norm_gs_dev, dev_lines)
+    norm_aut_dev_sent = extract_sentences(norm_aut_dev, dev_lines)
 
     # POS tagging
     non_standard_dev_pos = correct_pos(non_standard_dev_sent, non_standard_dev)  # lower bound POS
@@ -405,7 +363,6 @@ def main():
     norm_aut_dev_pos = correct_pos(norm_aut_dev_sent, norm_aut_dev)              # baseline POS
 
     # write 8-column-file with new POS tags
-    write_outfile(dev_lines, non_standard_dev_pos, norm_gs_dev_pos, norm_aut_dev_pos, dev_path_in)
     new_dev_path = write_outfile(dev_lines, non_standard_dev_pos, norm_gs_dev_pos, norm_aut_dev_pos, dev_path_in)
 
     # ------------------------------------ process TEST DATA -------------------------------------
@@ -413,10 +370,9 @@ def main():
     non_standard_test, norm_gs_test, norm_aut_test = columns_to_lists(test_lines)
 
     # extract sentences
-    test_lines2 = test_lines.copy()
-    non_standard_test_sent = extract_sentences(non_standard_test, test_lines2)
-    norm_gs_test_sent = extract_sentences(norm_gs_test, test_lines2)
-    norm_aut_test_sent = extract_sentences(norm_aut_test, test_lines2)
+    non_standard_test_sent = extract_sentences(non_standard_test, test_lines)
+    norm_gs_test_sent = extract_sentences(norm_gs_test, test_lines)
+    norm_aut_test_sent = extract_sentences(norm_aut_test, test_lines)
 
     # POS tagging
     non_standard_test_pos = correct_pos(non_standard_test_sent, non_standard_test)  # lower bound POS
@@ -424,7 +380,6 @@ def main():
     norm_aut_test_pos = correct_pos(norm_aut_test_sent, norm_aut_test)              # baseline POS
 
     # write 8-column-file with new POS tags
-    write_outfile(test_lines, non_standard_test_pos, norm_gs_test_pos, norm_aut_test_pos, test_path_in)
     new_test_path = write_outfile(test_lines, non_standard_test_pos, norm_gs_test_pos, norm_aut_test_pos, test_path_in)
 
     # ----------------------------------- accuracy report ---------------------------------------